@@ -4,6 +4,8 @@ Created on 17/12/2015
 @author: dtrazzi
 '''
 import os
+import imp
+import marshal
 
 import pysideuic
 import xml.etree.ElementTree as xml
@@ -43,24 +45,46 @@ def wrapinstance(ptr, base=None):
     else:
         return None
 
-def loadUiType(uiFile):
-    #'load a .ui file in memory'
+def compileUiType(uiFile):
+    #'compile a .ui file into python bytecode'
     parsed = xml.parse(uiFile)
     widget_class = parsed.find('widget').get('class')
     form_class = parsed.find('class').text
 
     with open(uiFile, 'r') as f:
         o = StringIO()
-        frame = {}
-
         pysideuic.compileUi(f, o, indent=0)
         pyc = compile(o.getvalue(), '<string>', 'exec')
-        exec pyc in frame
 
-        # Fetch the base_class and form class based on their type
-        # in the xml from designer
-        form_class = frame['Ui_%s'%form_class]
-        base_class = eval('QtGui.%s'%widget_class)
+    return widget_class, form_class, pyc
+
+def loadUiType(uiFile):
+    #'load a .ui file in memory'
+    # The compiled form is cached next to the .ui file and only rebuilt when the .ui
+    # or the python version changes
+    cacheFile = uiFile + '.pyc'
+    try:
+        if os.path.getmtime(cacheFile) < os.path.getmtime(uiFile):
+            raise IOError('%s is out of date' % cacheFile)
+        with open(cacheFile, 'rb') as f:
+            magic, widget_class, form_class, pyc = marshal.load(f)
+        if magic != imp.get_magic():
+            raise ValueError('%s was compiled by another python version' % cacheFile)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        widget_class, form_class, pyc = compileUiType(uiFile)
+        try:
+            with open(cacheFile, 'wb') as f:
+                marshal.dump((imp.get_magic(), widget_class, form_class, pyc), f)
+        except (IOError, OSError):
+            pass
+
+    frame = {}
+    exec pyc in frame
+
+    # Fetch the base_class and form class based on their type
+    # in the xml from designer
+    form_class = frame['Ui_%s'%form_class]
+    base_class = eval('QtGui.%s'%widget_class)
 
     return form_class, base_class
 
@@ -90,7 +114,7 @@ def run():
     try:
         my_window.close()
         my_window.deleteLater()
-    except: pass
+    except (NameError, RuntimeError): pass
     my_window = MyWindow()
     my_window.show()
     
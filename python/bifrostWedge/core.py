@@ -0,0 +1,654 @@
+"""
+This module can be used to generate wedges of Bifrost simulations.
+By parsing a scene file and a set of attributes can simulate, render and combine a video with an overlay of the adributes used.
+The script will also save out a copy of the maya file into the cache directory so it won't overwrite current files and the Artists will be able to open up the source fileused to generate the simulations.  
+
+Keyword arguments: 
+mayaFile          -- Maya file to use for simulation wedge.                                                  --  REQUIRED -- 
+projDir           -- Project path. This is used for setting up cache and render directories.                 --  REQUIRED -- 
+contrainerName    -- Name of the Bifrost container in the scene which will be used for the simulation wedge. --  REQUIRED -- 
+node              -- Node to use for wedge followed by attribute name. Example: --node emitterShape.bifrostLiquidStictionStrength --  REQUIRED -- 
+wedge             -- A list containing the values of attribues to wedge over. Example: --wedge 0 2 4         --  REQUIRED -- 
+frames            -- Start and end frame for the simulation. Example --frames 1 100                          --  REQUIRED -- 
+dryRun            -- If active will only generate Maya scene files withouth running the simulation. Used for debugging purposes.
+montage           -- If active will tile images as they get rendered and add watermarks to the final compositing
+keepFrames        -- If active will keep the tiled Montage images next to the quicktime. Used for debugging purposes.
+force             -- If active will regenerate the Maya scene files, renders and montage frames even if they already exist. Wedges whose value changed are always regenerated.
+spawn             -- If active will generate the Maya scene files in parallel worker processes, each one starting its own Maya session.
+jobs              -- Number of processes compositing the montage frames ( Default = number of CPUs )
+reference         -- If active will save the wedges as small Maya ascii files referencing the source scene instead of full copies of it.
+gpus              -- Number of GPUs available. One render runs per GPU at the same time ( Default = number of GPUs listed by nvidia-smi, 1 without it )
+
+Example : 
+mayapy ./bifWedge.py --mayaFile testProj/scenes/testScene.mb --projDir testProj --containerName bifrostLiquid1 --node bifrostLiquidContainer1.surfaceTension --wedge 0.0 0.073 0.2 --frames 1 10
+
+Ignore this:
+ffmpeg -y -f image2 -r 24 -i Montage.%04d.jpg -vcodec h264 -s 1280x720 stictionStrength.mov
+For full logging set: 
+setenv BIFROST_DUMP_STATE_SERVER 0
+ImageMagik for Mac Maverics can be downloaded here: http://cactuslab.com/imagemagick/
+"""
+
+import sys
+import os
+import argparse
+import math
+import time
+import threading
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    # Pillow doesn't ship with mayapy, the montage falls back on ImageMagick
+    Image = None
+import maya.standalone
+import maya.cmds as cmds
+
+
+# Number of tiled frames allowed to wait for the encoder
+MONTAGE_QUEUE_SIZE = 8
+# Final size of the montage frames
+MONTAGE_SIZE = (1280, 720)
+# Wedge label settings
+LABEL_POINTSIZE = 40
+LABEL_PADDING = 4
+LABEL_BACKGROUND = 'khaki'
+
+# Namespace of the source scene when wedge files reference it
+REFERENCE_NAMESPACE = 'src'
+
+_font = None
+_videoCodec = None
+
+_mayaInitialized = False
+
+
+def _setupWedges(job):
+    # Worker entry point. Maya standalone can only be initialized once per process
+    global _mayaInitialized
+    mayaFile, cacheDir, containerName, wedgeNode, wedges, reference = job
+    if not _mayaInitialized:
+        maya.standalone.initialize()
+        _mayaInitialized = True
+    # Open up the source maya scene file once for the whole chunk
+    try:
+        if reference:
+            # Start from an empty scene referencing the source one, so the
+            # wedge files only store the overrides instead of the whole scene
+            cmds.file(new=True, force=True)
+            # The reference is stored as given, make it absolute so the wedge loads from any working directory
+            cmds.file(os.path.abspath(mayaFile), reference=True, namespace=REFERENCE_NAMESPACE)
+            containerName = REFERENCE_NAMESPACE + ':' + containerName
+            wedgeNode = REFERENCE_NAMESPACE + ':' + wedgeNode
+        else:
+            cmds.file(mayaFile, open=True, force=True)
+    except RuntimeError:
+        raise RuntimeError("Something went wrong while trying to open the maya scene file: {0}. Check the path and try again".format(mayaFile))
+    return [_writeWedge(cacheDir, containerName, wedgeName, wedgeNode, attr, reference) for wedgeName, attr in wedges]
+
+
+def _scenePath(cacheDir, wedgeName, reference=False):
+    # Reference wedges are tiny ascii files, full copies of the scene are saved as binary
+    return os.path.join(cacheDir, wedgeName + ('.ma' if reference else '.mb'))
+
+
+def _valuePath(wedgePath):
+    # Sidecar holding the wedge value a scene file was saved with
+    return wedgePath + '.value'
+
+
+def _savedValue(wedgePath):
+    # Wedge value of an existing scene file, None if it can't be told
+    try:
+        with open(_valuePath(wedgePath)) as valueFile:
+            return float(valueFile.read())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _writeWedge(cacheDir, containerName, wedgeName, wedgeNode, attr, reference=False):
+    # Every wedge overrides the same attributes, so the open scene is reused without reloading it.
+    # Errors are raised rather than exiting: sys.exit would take down the pool worker.
+    # Select node for wedge and change attrs
+    try: 
+        cmds.setAttr(wedgeNode, attr)
+    except RuntimeError:
+        raise RuntimeError("Couldn't set the wedge attributes {0} on this node: {1}".format(attr, wedgeNode))
+    # Set containerNode to write cache
+    try:
+        # Wrties cache on /tmp folder
+        # cmds.setAttr(containerName+'.cachingControl', 0)
+        # Writes cache on cache folder
+        cmds.setAttr(containerName + '.enableDiskCache', 1)
+        cmds.setAttr(containerName + '.cachingControl', 2)
+        # This will break window version --> adding /
+        cmds.setAttr(containerName + '.cacheDir', cacheDir + '/', type="string")
+        cmds.setAttr(containerName + '.cacheName', wedgeName, type="string")
+    except RuntimeError:
+        raise RuntimeError("Couldn't set the Bifrost container: {0} to write status".format(containerName))
+    # Rename the scene file and saves it
+    wedgePath = _scenePath(cacheDir, wedgeName, reference)
+    # The value is dropped first and written last, so an interrupted save gets regenerated on the next run
+    try:
+        os.remove(_valuePath(wedgePath))
+    except OSError:
+        pass
+    try:
+        # save new maya scene file
+        cmds.file(rename=wedgePath)
+        cmds.file(save=True, force=True, defaultExtensions=False, type='mayaAscii' if reference else 'mayaBinary')
+    except RuntimeError:
+        raise RuntimeError("Can't save to the following location: {0}. Please check and try agian".format(wedgePath))
+    try:
+        with open(_valuePath(wedgePath), 'w') as valueFile:
+            valueFile.write(repr(attr))
+    except (IOError, OSError):
+        raise RuntimeError("Can't save to the following location: {0}. Please check and try agian".format(_valuePath(wedgePath)))
+    return wedgePath
+
+
+def _gpuCount():
+    # GPUs listed by the NVIDIA driver, a single one when it can't be queried
+    try:
+        with open(os.devnull, 'wb') as devnull:
+            gpus = subprocess.check_output(['nvidia-smi', '-L'], stderr=devnull).decode('utf-8', 'replace')
+    except (subprocess.CalledProcessError, OSError):
+        return 1
+    return max(1, sum(1 for line in gpus.splitlines() if line.startswith('GPU')))
+
+
+def _renderWedge(wedgeName, subprocess_cmd, freeGpus):
+    # Take a free GPU and pin the render to it so concurrent wedges don't fight over VRAM
+    gpu = freeGpus.get()
+    try:
+        env = dict(os.environ, CUDA_VISIBLE_DEVICES=str(gpu))
+        print('Rendering {0} on GPU {1}\n{2}'.format(wedgeName, gpu, ' '.join(subprocess_cmd)))
+        # Don't specify stdout because for some reason it's bein suppressed.
+        return subprocess.call(subprocess_cmd, stderr=subprocess.STDOUT, env=env)
+    finally:
+        freeGpus.put(gpu)
+
+
+def _isFresh(tile, renderStart):
+    # Tiles left by an earlier run don't count, only the ones written by the current renders
+    try:
+        return os.path.getmtime(tile) >= renderStart
+    except OSError:
+        return False
+
+
+def _waitForTiles(nextTiles, renderStart, renderDone):
+    # Render writes the frames in order, so a frame is complete once every wedge has started the next one.
+    # False when the renders finished without writing them all
+    while True:
+        done = renderDone.is_set()
+        if all(_isFresh(tile, renderStart) for tile in nextTiles):
+            return True
+        if done:
+            return False
+        renderDone.wait(1)
+
+
+def _isUpToDate(target, sources):
+    # True when the target exists and is newer than all of its sources
+    try:
+        mtime = os.path.getmtime(target)
+        return all(os.path.getmtime(source) <= mtime for source in sources)
+    except OSError:
+        return False
+
+
+def _fileTimes(directory):
+    # Modification time of every file in the directory, gathered in a single scan
+    times = {}
+    if hasattr(os, 'scandir'):
+        for entry in os.scandir(directory):
+            try:
+                times[entry.name] = entry.stat().st_mtime
+            except OSError:
+                pass
+    else:
+        for name in os.listdir(directory):
+            try:
+                times[name] = os.path.getmtime(os.path.join(directory, name))
+            except OSError:
+                pass
+    return times
+
+
+def _prefetchTiles(tileImages):
+    # Ask the kernel to start reading the tiles into the page cache so they are
+    # already in memory once they get composited. Only available on Linux.
+    for imageFile in tileImages:
+        try:
+            fd = os.open(imageFile, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _labelFont():
+    # Same font as the ImageMagick labels, DejaVu Sans on Linux boxes without Arial.
+    # Pillow's builtin font is sizable from Pillow 10.1, older ones only have a tiny bitmap
+    global _font
+    if _font is None:
+        for fontName in ('Arial', 'DejaVuSans.ttf'):
+            try:
+                _font = ImageFont.truetype(fontName, LABEL_POINTSIZE)
+                return _font
+            except (IOError, OSError):
+                pass
+        try:
+            _font = ImageFont.load_default(size=LABEL_POINTSIZE)
+        except TypeError:
+            _font = ImageFont.load_default()
+    return _font
+
+
+def _composeFrame(tileImages, wedgeTexts, columns):
+    # Pillow version of the convert call: label every render, tile them on a grid and resize to HD
+    font = _labelFont()
+    tiles = []
+    for imageFile, wedgeText in zip(tileImages, wedgeTexts):
+        image = Image.open(imageFile).convert('RGB')
+        if hasattr(font, 'getbbox'):
+            left, top, right, bottom = font.getbbox(wedgeText)
+            textSize = (right - left, bottom)
+        else:
+            textSize = font.getsize(wedgeText)
+        width = max(image.size[0], textSize[0])
+        labelHeight = textSize[1] + LABEL_PADDING * 2
+        tile = Image.new('RGB', (width, image.size[1] + labelHeight), LABEL_BACKGROUND)
+        tile.paste(image, ((width - image.size[0]) // 2, 0))
+        ImageDraw.Draw(tile).text(((width - textSize[0]) // 2, image.size[1] + LABEL_PADDING), wedgeText, fill='black', font=font)
+        tiles.append(tile)
+
+    tileWidth = max(tile.size[0] for tile in tiles)
+    tileHeight = max(tile.size[1] for tile in tiles)
+    rows = int(math.ceil(len(tiles) / float(columns)))
+    montage = Image.new('RGB', (tileWidth * columns, tileHeight * rows), 'white')
+    for i, tile in enumerate(tiles):
+        montage.paste(tile, ((i % columns) * tileWidth, (i // columns) * tileHeight))
+    return montage.resize(MONTAGE_SIZE, Image.BILINEAR)
+
+
+def _videoCodecArgs():
+    # Encode on the GPU with NVENC when ffmpeg has it and a device can open it, a quick
+    # probe catches builds listing h264_nvenc without a GPU around. Fast libx264 otherwise.
+    global _videoCodec
+    if _videoCodec is None:
+        nvenc = ['-c:v', 'h264_nvenc', '-preset', 'p1']
+        probe_cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'lavfi', '-i', 'nullsrc=s=256x256:d=0.1'] + nvenc + ['-f', 'null', '-']
+        try:
+            with open(os.devnull, 'wb') as devnull:
+                hasNvenc = subprocess.call(probe_cmd, stdout=devnull, stderr=devnull) == 0
+        except OSError:
+            hasNvenc = False
+        _videoCodec = nvenc if hasNvenc else ['-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'stillimage', '-threads', '0']
+    return _videoCodec
+
+
+def _montageFrame(task):
+    # Composite a single montage frame, runs on the montage worker processes.
+    # Failures come back to montage() through imap as a RuntimeError.
+    tileImages, wedgeTexts, columns, wedgePath, keepFrames, force = task
+
+    # Reuse the montage frame kept by a previous run if none of its tiles changed since
+    if not force and _isUpToDate(wedgePath, tileImages):
+        try:
+            if Image is not None:
+                return Image.open(wedgePath).convert('RGB').resize(MONTAGE_SIZE).tobytes()
+            with open(wedgePath, 'rb') as frameFile:
+                return frameFile.read()
+        except (IOError, OSError):
+            print(sys.exc_info())
+
+    # ADD TEXT TO THE RENDER FRAMES, TILE THEM TOGETHER AND RESIZE TO HD FORMAT
+    if Image is not None:
+        try:
+            image = _composeFrame(tileImages, wedgeTexts, columns)
+            if keepFrames:
+                image.save(wedgePath)
+            return image.tobytes()
+        except (IOError, OSError):
+            print(sys.exc_info())
+            raise RuntimeError("Something wrong happened while tiling images together")
+
+    # A single convert per frame, the rendered images are left untouched
+    try: 
+        subprocess_tile_cmd = ['convert', '-font', 'Arial', '-pointsize', str(LABEL_POINTSIZE), '-gravity', 'Center']
+        for n in range(0, len(tileImages), columns):
+            subprocess_tile_cmd.append('(')
+            for imageFile, wedgeText in zip(tileImages[n:n + columns], wedgeTexts[n:n + columns]):
+                subprocess_tile_cmd += ['(', imageFile, '-background', 'Khaki', 'label:' + wedgeText, '-append', ')']
+            subprocess_tile_cmd += ['+append', ')']
+        subprocess_tile_cmd += ['-background', 'white', '-append']
+        if keepFrames:
+            subprocess_tile_cmd += ['-write', wedgePath]
+        subprocess_tile_cmd.append('jpg:-')
+        print(' '.join(subprocess_tile_cmd))
+        return subprocess.check_output(subprocess_tile_cmd)
+    except (subprocess.CalledProcessError, OSError):
+        print(sys.exc_info())
+        raise RuntimeError("Something wrong happened while tiling images together. Please check you have imageMagik installed properly")
+
+
+def _montagePool(jobs):
+    # Compositing processes for the montage, none when a single job is asked for
+    jobs = max(1, jobs or multiprocessing.cpu_count())
+    return multiprocessing.Pool(jobs) if jobs > 1 else None
+
+
+def _pipeFrames(montageFrames, stream):
+    # Encoder stage: feed the tiled frames to ffmpeg in order as they come in
+    broken = False
+    while True:
+        frameData = montageFrames.get()
+        if frameData is None:
+            break
+        if broken:
+            # ffmpeg went away, keep draining so the tiling stage never blocks
+            continue
+        try:
+            stream.write(frameData)
+        except (IOError, OSError):
+            print(sys.exc_info())
+            broken = True
+    try:
+        stream.close()
+    except (IOError, OSError):
+        pass
+
+
+class biFrostWedge():
+
+    def __init__(self):
+
+        parser = argparse.ArgumentParser(description='BiFrost wedge tool.', epilog='For support or feedback email Diego Trazzi')
+        parser.add_argument('--mayaFile', '-f', required=True, help='Maya scene file name')
+        parser.add_argument('--projDir', required=True, help='Maya project directory')
+        parser.add_argument('--containerName', required=True, help='Name of the Bifrost container: eg,: bifrostLiquidContainer1')
+        parser.add_argument('--node', required=True, help='Node to wedge followed by attribute name. Example: emitterShape.bifrostLiquidStictionStrength')
+        parser.add_argument('--wedge', required=True, nargs='+', help='Wedge list. Example : 0 2 4')
+        parser.add_argument('--frames', required=True, type=int, help='Define the frame range. Required to run', nargs=2)
+        parser.add_argument('--dryRun', help='Optional flag for generating maya files only ( Default = False )', action='store_true', default=False)
+        parser.add_argument('--montage', help='Generate tiled images from cached wedge of simulations. Frames are tiled and encoded while the renders are still running ( Default = False )', action='store_true', default=False)
+        parser.add_argument('--keepFrames', help='Keep the tiled Montage.####.jpg images, by default they are only streamed to the quicktime ( Default = False )', action='store_true', default=False)
+        parser.add_argument('--force', help='Regenerate scene files, renders and montage frames that already exist. Wedges whose value changed are always regenerated ( Default = False )', action='store_true', default=False)
+        parser.add_argument('--spawn', help='Generate the scene files in parallel worker processes instead of the current Maya session. Only worth it for large wedges of heavy scenes ( Default = False )', action='store_true', default=False)
+        parser.add_argument('--jobs', '-j', type=int, default=multiprocessing.cpu_count(), help='Number of processes compositing the montage frames ( Default = number of CPUs )')
+        parser.add_argument('--reference', help='Save the wedges as Maya ascii files referencing the source scene and only storing the wedge overrides. Scene wide render settings are not carried over by references ( Default = False )', action='store_true', default=False)
+        parser.add_argument('--gpus', type=int, default=_gpuCount(), help='Number of GPUs to spread the renders over. One wedge renders per GPU at the same time ( Default = number of GPUs listed by nvidia-smi, 1 without it )')
+
+        # PARSE ARGUMENTS FROM COMMAND LINE
+        args = parser.parse_args()
+
+        # JUMP TO MAIN
+        self.main(mayaFile=args.mayaFile, projDir=args.projDir, containerName=args.containerName, wedgeNode=args.node, wedgeList=args.wedge, dryRun=args.dryRun, montage=args.montage, frames=args.frames, gpus=args.gpus, keepFrames=args.keepFrames, force=args.force, spawn=args.spawn, jobs=args.jobs, reference=args.reference)
+
+    def main(self, mayaFile, projDir, containerName, wedgeNode, wedgeList, dryRun, montage, frames, gpus=1, keepFrames=False, force=False, spawn=False, jobs=None, reference=False):
+
+        # fetch the scene filename
+        sceneName = os.path.split(mayaFile)[-1].split('.')[0]
+        nodeName = wedgeNode.replace('.', '_')
+        # setup the cache directory
+        cacheDir = os.path.join(projDir, 'cache', 'bifrost', sceneName, nodeName)
+        try:
+            os.makedirs(cacheDir)
+        except OSError:
+            # Already there from a previous run
+            if not os.path.isdir(cacheDir):
+                raise
+        
+        # print out summary before executions    
+        print( "Maya file to wedge:\t\t{:30}\nMaya project directory:\t\t{:30}\nNode and attribute to wedge:\t{:30}\nWedge list:\t\t\t{:30}".format(mayaFile,projDir,wedgeNode,wedgeList))
+        # GENERATE THE NEW MAYA WEDGE FILES
+        # Wedge names and labels are shared by the scene files, the renders and the montage
+        self.wedgeNames = tuple("{name}_{val:02d}".format(name=nodeName, val=i) for i in range(len(wedgeList)))
+        self.wedgeTexts = tuple('{0}: {1}'.format(wedgeName, value) for wedgeName, value in zip(self.wedgeNames, wedgeList))
+        # MONTAGE WORKERS
+        # Forked before Maya is initialized in this process and before any thread starts, so the
+        # workers inherit neither Maya's state nor a lock held by another thread. With spawn Maya
+        # never runs here and the scene workers must be forked first, before the pool threads.
+        montagePool = None
+        if montage and not spawn:
+            montagePool = _montagePool(jobs)
+        try: 
+            wedgePaths = self.wedgeSetup(mayaFile, cacheDir, containerName, wedgeNode, zip(self.wedgeNames, wedgeList), force, spawn, reference)
+        except RuntimeError: 
+            print(sys.exc_info())
+            sys.exit("Couldn't setup wedgescene file")
+        if montage and spawn:
+            montagePool = _montagePool(jobs)
+
+        # LOOP THROUGHT THE WEDGE LIST
+        renders = []
+        # The existing renders are listed once, each scene file is checked against them
+        renderTimes = _fileTimes(cacheDir)
+        frameNames = ['.{0:04d}.jpg'.format(f) for f in range(frames[0], frames[1] + 1)]
+        for i in range(len(wedgeList)):
+            print('\nWedge numer:\t%02d' % i)
+            wedgeName = self.wedgeNames[i]
+            wedgePath = wedgePaths[i]
+            print(wedgePath)
+
+            # Frames older than the scene file were rendered from a previous version of the wedge
+            try:
+                sceneTime = os.path.getmtime(wedgePath)
+            except OSError:
+                sceneTime = None
+            if not force and sceneTime is not None and all(renderTimes.get(wedgeName + frameName, -1) >= sceneTime for frameName in frameNames):
+                print("Wedge already rendered, skipping. Use --force to render it again")
+            elif not dryRun:
+                # QUEUE A RENDER SESSION WITH THE WEDGE FILE
+                subprocess_cmd = ['Render', '-renderer', 'hw2', '-fnc', '3', '-s', str(frames[0]), '-e', str(frames[1]), '-pad', '4', '-x', '1280', '-y', '720', '-of', 'jpg', '-proj', projDir, '-rd', cacheDir, '-im', wedgeName, wedgePath]
+                renders.append((wedgeName, subprocess_cmd))
+            else:
+                print("Not running render. Option dryRun set True")
+
+        # RENDER ALL THE WEDGES
+        # Runs in the background so the montage can tile every frame as soon as all the wedges have rendered it
+        failed = []
+        renderDone = threading.Event()
+        # Only the tiles of the queued wedges written after this point are new
+        renderStart = time.time()
+        renderedWedges = frozenset(wedgeName for wedgeName, _ in renders)
+        def renderAll():
+            try:
+                failed.extend(self.render(renders, gpus))
+            finally:
+                renderDone.set()
+        renderThread = threading.Thread(target=renderAll)
+        renderThread.start()
+        # MONTAGE
+        try:
+            if montage:
+                self.montage(cacheDir, self.wedgeNames, self.wedgeTexts, frames, renderDone=renderDone, renderStart=renderStart, renderedWedges=renderedWedges, renderFailed=failed, keepFrames=keepFrames, force=force, jobs=jobs, pool=montagePool)
+        finally:
+            # Failed renders are reported even when the montage bailed out
+            if montagePool is not None:
+                montagePool.terminate()
+                montagePool.join()
+            renderThread.join()
+            if failed:
+                sys.exit("Render failed for the following wedges: {0}".format(', '.join(failed)))
+        return
+
+
+    def render(self, renders, gpus=1):
+        # Wedges are independent so they render side by side, one per GPU.
+        # The heavy lifting happens in the Render processes, threads are enough to drive them.
+        freeGpus = queue.Queue()
+        for gpu in range(max(1, gpus)):
+            freeGpus.put(gpu)
+        pool = ThreadPool(freeGpus.qsize())
+        try:
+            results = pool.map(lambda job: _renderWedge(job[0], job[1], freeGpus), renders)
+        finally:
+            pool.close()
+            pool.join()
+        # Return the wedges that failed to render
+        return [wedgeName for (wedgeName, _), code in zip(renders, results) if code != 0]
+
+
+    def wedgeSetup(self, mayaFile, cacheDir, containerName, wedgeNode, wedges, force=False, spawn=False, reference=False):
+        # Validate the wedge values up front so a typo doesn't cost a Maya session
+        jobs = []
+        wedgePaths = []
+        for wedgeName, wedgeAttr in wedges:
+            try:
+                attr = float(wedgeAttr)
+            except ValueError:
+                print(sys.exc_info())
+                sys.exit("Cant convert {0} into a float number".format(wedgeAttr))
+            wedgePath = _scenePath(cacheDir, wedgeName, reference)
+            wedgePaths.append(wedgePath)
+            # Scene files left by a previous run are kept unless forced or saved with another value
+            if force or not os.path.exists(wedgePath) or _savedValue(wedgePath) != attr:
+                jobs.append((wedgeName, attr))
+        if not jobs:
+            print("Wedge scene files already exist, skipping. Use --force to generate them again")
+            return wedgePaths
+
+        if not spawn:
+            # Maya starts and loads the source scene once in this process, then every wedge
+            # file is written from the open scene. Startup dwarfs the work done per wedge.
+            _setupWedges((mayaFile, cacheDir, containerName, wedgeNode, jobs, reference))
+            print("Success")
+            return wedgePaths
+
+        # Split the wedges in contiguous chunks, one per worker. Each worker starts
+        # Maya and loads the source scene once, then writes all the files of its chunk.
+        workers = max(1, min(len(jobs), multiprocessing.cpu_count()))
+        step = int(math.ceil(len(jobs) / float(workers)))
+        chunks = [(mayaFile, cacheDir, containerName, wedgeNode, jobs[n:n + step], reference) for n in range(0, len(jobs), step)]
+        pool = multiprocessing.Pool(len(chunks))
+        try:
+            pool.map(_setupWedges, chunks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        print("Success")
+
+        return wedgePaths
+
+
+    def loadMaya(self):
+        maya.standalone.initialize()
+
+
+    def montage(self, cacheDir, wedgeNames, wedgeTexts, frames, fps=23.98, renderDone=None, renderStart=None, renderedWedges=(), renderFailed=(), keepFrames=False, force=False, jobs=None, pool=None):
+        # Frames are independent and composited on a pool of processes. It is created
+        # here unless given, before the encoder thread starts so no lock is held when forking.
+        ownsPool = pool is None
+        if ownsPool:
+            pool = _montagePool(jobs)
+
+        # START THE ENCODER
+        # Frames are streamed to ffmpeg while the next ones are still being tiled, they only
+        # hit the disk with keepFrames. Pillow frames are sent as raw pixels, ImageMagick ones as jpg.
+        movPath = os.path.join(cacheDir, 'Montage.mov')
+        if Image is not None:
+            subprocess_mkMovie_cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '{0}x{1}'.format(*MONTAGE_SIZE), '-r', str(fps), '-i', '-']
+        else:
+            # ffmpeg scales the tiled frames to HD itself, convert doesn't need a resize pass
+            subprocess_mkMovie_cmd = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'image2pipe', '-c:v', 'mjpeg', '-r', str(fps), '-i', '-', '-vf', 'scale={0}:{1}'.format(*MONTAGE_SIZE)]
+        subprocess_mkMovie_cmd += _videoCodecArgs() + ['-pix_fmt', 'yuv420p', movPath]
+        print(' '.join(subprocess_mkMovie_cmd))
+        try:
+            ffmpeg = subprocess.Popen(subprocess_mkMovie_cmd, stdin=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError:
+            print("Something wrong happened while generating the quicktime movie")
+            print(sys.exc_info())
+            if ownsPool and pool is not None:
+                pool.terminate()
+                pool.join()
+            return
+        montageFrames = queue.Queue(maxsize=MONTAGE_QUEUE_SIZE)
+        encoder = threading.Thread(target=_pipeFrames, args=(montageFrames, ffmpeg.stdin))
+        encoder.start()
+
+        # Tiles are laid out on the same grid montage would pick
+        columns = int(math.ceil(math.sqrt(len(wedgeNames))))
+        jobs = max(1, jobs or multiprocessing.cpu_count()) if pool is not None else 1
+        # Bounds the frames composited ahead of the encoder
+        inFlightSize = jobs + MONTAGE_QUEUE_SIZE
+        inFlight = threading.Semaphore(inFlightSize)
+        stopped = threading.Event()
+
+        # Paths only differ by their frame number, the directory part is joined once
+        cachePrefix = os.path.join(cacheDir, '')
+        tilePrefixes = [cachePrefix + wedgeName + '.' for wedgeName in wedgeNames]
+        montagePrefix = cachePrefix + 'Montage.'
+
+        def frameTasks():
+            firstFrame = '{0:04d}.jpg'.format(frames[0])
+            nextTiles = [tilePrefix + firstFrame for tilePrefix in tilePrefixes]
+            for f in range(frames[0], frames[1] + 1):
+                # The tiles of this frame were already listed as the next ones on the previous frame
+                tileImages = nextTiles
+                frame = '{0:04d}'.format(f)
+                nextFrame = '{0:04d}'.format(f + 1)
+                nextTiles = [tilePrefix + nextFrame + '.jpg' for tilePrefix in tilePrefixes]
+                if renderDone is not None:
+                    # Wedges that aren't being rendered already have all their tiles
+                    ready = _waitForTiles([tile for tile, wedgeName in zip(nextTiles, wedgeNames) if wedgeName in renderedWedges], renderStart, renderDone)
+                    # Failures are listed before renderDone is set. The missing tiles will never
+                    # show up, stop at the last frame every wedge rendered
+                    if not ready and renderFailed:
+                        return
+                # Read ahead the next frame in the background while this one is composited
+                if f < frames[1] and hasattr(os, 'posix_fadvise'):
+                    prefetch = threading.Thread(target=_prefetchTiles, args=(nextTiles,))
+                    prefetch.daemon = True
+                    prefetch.start()
+                wedgePath = montagePrefix + frame + '.jpg'
+                inFlight.acquire()
+                if stopped.is_set():
+                    return
+                yield (tileImages, wedgeTexts, columns, wedgePath, keepFrames, force)
+
+        # imap hands the frames back in order so they can be streamed to the encoder as they finish
+        try:
+            if pool is not None:
+                montages = pool.imap(_montageFrame, frameTasks())
+            else:
+                montages = (_montageFrame(task) for task in frameTasks())
+            for frameData in montages:
+                montageFrames.put(frameData)
+                inFlight.release()
+        except RuntimeError:
+            print(sys.exc_info())
+            sys.exit(str(sys.exc_info()[1]))
+        finally:
+            # Unblock the task generator so the pool can shut down
+            stopped.set()
+            for _ in range(inFlightSize):
+                inFlight.release()
+            if ownsPool and pool is not None:
+                pool.terminate()
+                pool.join()
+            # Let the encoder drain the queue and close the movie
+            montageFrames.put(None)
+            encoder.join()
+
+        # MAKE A QUICKTIME
+        if ffmpeg.wait() != 0:
+            print("Something wrong happened while generating the quicktime movie")
+            return
+        if renderFailed:
+            print("Some renders failed, the quicktime stops at the last frame rendered by every wedge: {0}".format(movPath))
+            return
+        print("Successfully generated wedge. Quicktime file: {0}".format(movPath))
+        return movPath